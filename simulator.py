@@ -1,18 +1,27 @@
+from array import array
 from enum import Enum
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import simulator_core
+except ImportError:
+    simulator_core = None
+
 
 class Instruction:
-    def execute(self, interpreter):
-        raise NotImplementedError("Subclasses must implement execute")
+    __slots__ = ()
 
 
 class PushOp(Instruction):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
-    def execute(self, interpreter):
-        interpreter.execute_push(self.value)
-
     def __eq__(self, other):
         return isinstance(other, PushOp) and self.value == other.value
 
@@ -30,9 +39,6 @@ class UnaryOp(Instruction, Enum):
     Q = 'Q'
     PRINT = 'print'
 
-    def execute(self, interpreter):
-        interpreter.execute_unary_op(self)
-
 
 class BinaryOp(Instruction, Enum):
     PAIR = 'pair'
@@ -41,254 +47,1118 @@ class BinaryOp(Instruction, Enum):
     MUL = 'mul'
     DIV = 'div'
 
-    def execute(self, interpreter):
-        interpreter.execute_binary_op(self)
-
-    def is_numeric(self):
-        return self in [BinaryOp.ADD, BinaryOp.SUB, BinaryOp.MUL, BinaryOp.DIV]
-
 
 class TernaryOp(Instruction, Enum):
     PICK = 'pick'
 
-    def execute(self, interpreter):
-        interpreter.execute_ternary_op(self)
-
 
 class JumpOp(Instruction, Enum):
     JUMP = 'jump'
     QUIT = 'quit'
 
-    def execute(self, interpreter):
-        interpreter.execute_jump(self)
-
 
 class TreeNode:
-    pass
+    __slots__ = ()
 
 
 class BinaryNode(TreeNode):
+    __slots__ = ('left', 'right', '_hash')
+
+    # Nodes cache the hash of their subtree, so they can't be changed once
+    # they are built.
     def __init__(self, left, right):
-        self.left = left
-        self.right = right
+        object.__setattr__(self, 'left', left)
+        object.__setattr__(self, 'right', right)
+        object.__setattr__(self, '_hash', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __reduce__(self):
+        return BinaryNode, (self.left, self.right)
 
     def __str__(self):
         return f"({self.left} :+: {self.right})"
 
     def __eq__(self, other):
-        return isinstance(other, BinaryNode) and self.left == other.left and self.right == other.right
+        # Trees can be far deeper than the recursion limit, so compare them
+        # with a worklist; the cached hashes rule out most unequal subtrees.
+        if not isinstance(other, BinaryNode):
+            return False
+        pending = [(self, other)]
+        while pending:
+            a, b = pending.pop()
+            if a is b:
+                continue
+            if isinstance(a, BinaryNode):
+                if not isinstance(b, BinaryNode) or hash(a) != hash(b):
+                    return False
+                pending.append((a.left, b.left))
+                pending.append((a.right, b.right))
+            elif a != b:
+                return False
+        return True
+
+    def __hash__(self):
+        if self._hash is None:
+            # Hash the unhashed subtrees bottom-up, without recursing.
+            pending = [self]
+            while pending:
+                node = pending[-1]
+                children = [child for child in (node.left, node.right)
+                            if isinstance(child, BinaryNode) and child._hash is None]
+                if children:
+                    pending.extend(children)
+                else:
+                    pending.pop()
+                    object.__setattr__(node, '_hash', hash((hash(node.left), hash(node.right))))
+        return self._hash
 
 
 class NilNode(TreeNode):
+    __slots__ = ()
+
     def __str__(self):
         return "nil"
 
     def __eq__(self, other):
         return isinstance(other, NilNode)
 
+    def __hash__(self):
+        return hash(NilNode)
+
 
 class NumberNode(TreeNode):
-    def __init__(self, value):
-        self.value = value
+    __slots__ = ('value',)
+
+    # Like CPython's small ints, nodes for small values are shared, so
+    # `value` can't be changed once the node is built.
+    _cache = {}
+
+    def __new__(cls, value):
+        small = -128 <= value <= 256
+        if small and value in cls._cache:
+            return cls._cache[value]
+        node = super().__new__(cls)
+        object.__setattr__(node, 'value', value)
+        if small:
+            cls._cache[value] = node
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __reduce__(self):
+        return NumberNode, (self.value,)
 
     def __str__(self):
         return str(self.value)
 
     def __eq__(self, other):
-        return isinstance(other, NumberNode) and self.value == other.value
+        return self is other or (isinstance(other, NumberNode) and self.value == other.value)
+
+    def __hash__(self):
+        return hash(self.value)
+
+
+K_NIL = 0
+K_NUM = 1
+K_PAIR = 2
+
+ARGUMENT_COUNTS = {1: "an argument", 2: "two arguments", 3: "three arguments"}
+
+MAX_CODE_POINT = 0x10FFFF
+
+
+def as_value(node):
+    """Convert a TreeNode into a (kind, payload) pair.
+
+    Numbers are stored as plain ints, nil as None, and binary nodes as a
+    (left_kind, left_payload, right_kind, right_payload) tuple.  The tree is
+    walked with a worklist rather than recursion, so any depth works.
+    """
+    values = {}
+    pending = [node]
+    while pending:
+        current = pending[-1]
+        if id(current) in values:
+            pending.pop()
+        elif isinstance(current, NumberNode):
+            values[id(current)] = K_NUM, current.value
+        elif isinstance(current, NilNode):
+            values[id(current)] = K_NIL, None
+        else:
+            assert isinstance(current, BinaryNode), f"Cannot convert {current!r} to a tree value"
+            children = [child for child in (current.left, current.right) if id(child) not in values]
+            if children:
+                pending.extend(children)
+            else:
+                values[id(current)] = K_PAIR, values[id(current.left)] + values[id(current.right)]
+    return values[id(node)]
+
+
+def as_node(kind, value, memo):
+    """Rebuild the TreeNode for a (kind, payload) pair.
+
+    Pairs are rebuilt bottom-up from a worklist, so deep trees in either
+    direction don't hit the recursion limit.  Subtrees shared by `rec_left`
+    are rebuilt once and cached in `memo`, keyed by the id of their payload.
+    """
+    if kind == K_NUM:
+        return NumberNode(value)
+    if kind == K_NIL:
+        return NilNode()
+    pending = [value]
+    while pending:
+        pair = pending[-1]
+        if id(pair) in memo:
+            pending.pop()
+            continue
+        left_kind, left, right_kind, right = pair
+        children = [child for child_kind, child in ((left_kind, left), (right_kind, right))
+                    if child_kind == K_PAIR and id(child) not in memo]
+        if children:
+            pending.extend(children)
+            continue
+        pending.pop()
+        memo[id(pair)] = BinaryNode(
+            memo[id(left)] if left_kind == K_PAIR else as_node(left_kind, left, memo),
+            memo[id(right)] if right_kind == K_PAIR else as_node(right_kind, right, memo),
+        )
+    return memo[id(value)]
+
+
+# Opcodes are numbered by how often they run in the examples and in
+# typical counted loops, so that the hot handlers sit next to each other
+# in the dispatch table.
+OP_RIGHT_ON_RIGHT = 0
+OP_PAIR = 1
+OP_PUSH_NUM = 2
+OP_REC_LEFT = 3
+OP_PUSH_NIL = 4
+OP_RIGHT = 5
+OP_LEFT_ON_RIGHT = 6
+OP_JUMP = 7
+OP_LEFT = 8
+OP_PICK = 9
+OP_SUB_IMM = 10
+OP_ADD_IMM = 11
+OP_Q_IMM = 12
+OP_JUMP_IMM = 13
+OP_PAIR_RIGHT_ON_RIGHT = 14
+OP_PAIR_LEFT_ON_RIGHT = 15
+OP_UNPAIR_PAIR = 16
+OP_ADD = 17
+OP_SUB = 18
+OP_PRINT = 19
+OP_MUL = 20
+OP_Q = 21
+OP_DIV = 22
+OP_MUL_IMM = 23
+OP_DIV_IMM = 24
+OP_UNPAIR = 25
+OP_PUSH_PAIR = 26
+OP_QUIT = 27
+OP_HOTSPOT = 28
+
+if simulator_core is not None and any(globals().get(name) != op for name, op in simulator_core.OPCODES.items()):
+    # Built against a different opcode numbering; ignore it until it is rebuilt.
+    simulator_core = None
+
+PUSH_OPCODES = {K_NUM: OP_PUSH_NUM, K_NIL: OP_PUSH_NIL, K_PAIR: OP_PUSH_PAIR}
+
+OPCODES = {
+    UnaryOp.RIGHT: OP_RIGHT,
+    UnaryOp.LEFT: OP_LEFT,
+    UnaryOp.REC_LEFT: OP_REC_LEFT,
+    UnaryOp.LEFT_ON_RIGHT: OP_LEFT_ON_RIGHT,
+    UnaryOp.RIGHT_ON_RIGHT: OP_RIGHT_ON_RIGHT,
+    UnaryOp.UNPAIR: OP_UNPAIR,
+    UnaryOp.Q: OP_Q,
+    UnaryOp.PRINT: OP_PRINT,
+    BinaryOp.PAIR: OP_PAIR,
+    BinaryOp.ADD: OP_ADD,
+    BinaryOp.SUB: OP_SUB,
+    BinaryOp.MUL: OP_MUL,
+    BinaryOp.DIV: OP_DIV,
+    TernaryOp.PICK: OP_PICK,
+    JumpOp.JUMP: OP_JUMP,
+    JumpOp.QUIT: OP_QUIT,
+}
+
+
+def lower(code):
+    """Lower a list of instructions to parallel opcode and operand arrays.
+
+    Only pushes carry an operand: the payload of the pushed value.
+    """
+    opcodes = array('B')
+    operands = []
+    for instruction in code:
+        if isinstance(instruction, PushOp):
+            kind, value = as_value(instruction.value)
+            opcodes.append(PUSH_OPCODES[kind])
+            operands.append(value)
+        else:
+            opcodes.append(OPCODES[instruction])
+            operands.append(None)
+    return opcodes, operands
+
+
+# Superinstructions replace the first instruction of a common pair and use
+# its operand, if any.  The second instruction is left in place in case a
+# jump lands on it directly.
+SUPERINSTRUCTIONS = {
+    (OP_PUSH_NUM, OP_JUMP): OP_JUMP_IMM,
+    (OP_PUSH_NUM, OP_ADD): OP_ADD_IMM,
+    (OP_PUSH_NUM, OP_SUB): OP_SUB_IMM,
+    (OP_PUSH_NUM, OP_MUL): OP_MUL_IMM,
+    (OP_PUSH_NUM, OP_DIV): OP_DIV_IMM,
+    (OP_PUSH_NUM, OP_Q): OP_Q_IMM,
+    (OP_PAIR, OP_RIGHT_ON_RIGHT): OP_PAIR_RIGHT_ON_RIGHT,
+    (OP_PAIR, OP_LEFT_ON_RIGHT): OP_PAIR_LEFT_ON_RIGHT,
+    (OP_UNPAIR, OP_PAIR): OP_UNPAIR_PAIR,
+}
+
+
+def fuse(opcodes):
+    """Peephole pass rewriting instruction pairs into superinstructions in place."""
+    for i in range(len(opcodes) - 1):
+        fused = SUPERINSTRUCTIONS.get((opcodes[i], opcodes[i + 1]))
+        if fused is not None:
+            opcodes[i] = fused
+
+
+# When the compiled core stops at something it can't do, such as a number
+# that doesn't fit in 64 bits, the Python handlers take over for a stretch
+# of instructions and then hand back.  The stretch doubles, up to this many
+# steps, each time the core gets less done than the Python loop did, so a
+# program that keeps a big number around doesn't keep reloading the core.
+MAX_PYTHON_STRETCH = 1 << 16
 
 
 class Simulator:
-    code: list[Instruction]
+    """Interpreter for the tree bytecode, given as the arrays returned by parse.
+
+    The right spine of the tree (xs :+: a :+: b :+: ...) is kept as a stack:
+    `kinds[i]` holds the K_* tag of the i-th cell and `vals[i]` its payload.
+    Everything below the bottom cell is the `base` tree, which gets unfolded
+    into cells as instructions pop past it.
+
+    Number cells keep their value as a plain int in `vals`, so arithmetic
+    only checks the tags and updates the payload in place.  The Q data is
+    kept in an array('q'), and printed characters are collected as code
+    points in the array('L') `output`.
+
+    If the compiled simulator_core module is available, run() hands the
+    program to it.  Instructions the compiled loop can't execute are run by
+    the Python handlers, which hand back to it afterwards (see
+    MAX_PYTHON_STRETCH).  Pass native=False to
+    always use the Python handlers.  The compiled loop sizes its stack for
+    `stack_hint` cells up front, so programs that build deep trees can pass
+    their expected depth to save regrowing it.
+
+    With jit=True (which needs Numba), the Python handlers count backward
+    jumps, and loops that run often enough are compiled; see compile_trace.
+    This only affects the Python handlers, not the compiled core.
+    """
+    opcodes: array
+    operands: list
     ip: int
     total_steps: int
-    tree: TreeNode
-
-    def __init__(self, code: list[Instruction], data: list[int] = None):
-        self.code = code
+    kinds: array
+    vals: list
+    data: array
+
+    def __init__(self, opcodes: array, operands: list, data=None, native=True, jit=False, stack_hint=0):
+        # Copied because fuse and the JIT rewrite opcodes in place.
+        self.opcodes = array('B', opcodes)
+        self.operands = operands
+        fuse(self.opcodes)
         self.ip = 0
         self.total_steps = 0
-        self.tree = NilNode()
-        self.data = data or []
-        self.output = []
+        self.kinds = array('b')
+        self.vals = []
+        self.base_kind = K_NIL
+        self.base_val = None
+        self.data = array('q', () if data is None else data)
+        self.output = array('L')
+        self.native = native and simulator_core is not None
+        self.stack_hint = stack_hint
+        self.jit = jit
+        # Backward jumps taken per target; only targets inside the program
+        # are counted, so a list the size of the program covers them all.
+        self.loop_counts = [0] * len(self.opcodes) if jit else []
+        self.traces: dict[int, Trace] = {}
+
+    @property
+    def tree(self):
+        memo = {}
+        node = as_node(self.base_kind, self.base_val, memo)
+        for kind, value in zip(self.kinds, self.vals):
+            node = BinaryNode(node, as_node(kind, value, memo))
+        return node
 
     def run(self):
-        while self.ip < len(self.code):
-            inst = self.code[self.ip]
-            self.execute_instruction(inst)
-            self.total_steps += 1
-
+        if not self.native:
+            self.interpret()
+            return self.tree
+
+        n = len(self.opcodes)
+        stretch = 1
+        while self.ip < n:
+            steps = self.total_steps
+            simulator_core.run(self)
+            if self.ip >= n:
+                break
+            if self.total_steps - steps >= stretch:
+                stretch = 1
+            else:
+                stretch = min(stretch * 2, MAX_PYTHON_STRETCH)
+            self.interpret(stretch)
         return self.tree
 
-    def execute_instruction(self, instruction):
-        instruction.execute(self)
-        if not isinstance(instruction, JumpOp):
-            self.ip += 1
-
-    def execute_push(self, value):
-        self.tree = BinaryNode(self.tree, value)
-
-    def execute_unary_op(self, op: UnaryOp):
-        assert isinstance(self.tree, BinaryNode), f"Operation '{op.value}' requires an argument"
-        arg = self.tree.right
-        rest = self.tree.left
-        match op:
-            case UnaryOp.LEFT:
-                # left: xs :+: ys ~> xs
-                self.tree = rest
-
-            case UnaryOp.RIGHT:
-                # right: xs :+: ys ~> ys
-                self.tree = arg
-
-            case UnaryOp.REC_LEFT:
-                # rec_left: xs :+: n ~> xs :+: ys, where ys is the nth left child of xs
-                assert isinstance(arg, NumberNode), "Operation 'rec_left' requires a numeric argument"
-                n = arg.value
-                result = rest
-                for _ in range(n):
-                    assert isinstance(result, BinaryNode), "Operation 'rec_left' invoked with too great a depth"
-                    result = result.left
-                self.tree = BinaryNode(rest, result)
-
-            case UnaryOp.LEFT_ON_RIGHT:
-                # left_on_right: xs :+: (ys :+: zs) ~> xs :+: ys
-                assert isinstance(arg, BinaryNode), "Operation 'left_on_right' requires a binary argument"
-                self.tree = BinaryNode(rest, arg.left)
-
-            case UnaryOp.RIGHT_ON_RIGHT:
-                assert isinstance(arg, BinaryNode), "Operation 'right_on_right' requires a binary argument"
-                # right_on_right: xs :+: (ys :+: zs) ~> xs :+: zs
-                self.tree = BinaryNode(rest, arg.right)
-
-            case UnaryOp.UNPAIR:
-                assert isinstance(arg, BinaryNode), "Operation 'unpair' requires a binary argument"
-                self.tree = BinaryNode(BinaryNode(rest, arg.left), arg.right)
-
-            case UnaryOp.Q:
-                # Q: xs :+: n ~> xs :+: Q(n)
-                assert isinstance(arg, NumberNode), "Operation 'Q' requires a numeric argument"
-                n = arg.value
-                if n < len(self.data):
-                    result = self.data[n]
-                else:
-                    result = 0
-                self.tree = BinaryNode(rest, NumberNode(result))
-
-            case UnaryOp.PRINT:
-                # print: xs :+: n ~> xs
-                self.output.append(chr(arg.value))
-                self.tree = rest
-
-    def execute_binary_op(self, op: BinaryOp):
-        assert isinstance(self.tree, BinaryNode), f"Operation '{op.value}' requires an argument"
-        assert isinstance(self.tree.left, BinaryNode), f"Operation '{op.value}' requires two arguments"
-        arg1 = self.tree.right
-        arg2 = self.tree.left.right
-        rest = self.tree.left.left
-
-        if op.is_numeric():
-            assert isinstance(arg1, NumberNode), f"Operation '{op.value}' requires numeric arguments"
-            assert isinstance(arg2, NumberNode), f"Operation '{op.value}' requires numeric arguments"
-
-        match op:
-            case BinaryOp.PAIR:
-                # pair: xs :+: ys :+: zs ~> xs :+: (ys :+: zs)
-                self.tree = BinaryNode(rest, BinaryNode(arg2, arg1))
-
-            case BinaryOp.ADD:
-                # plus: xs :+: y :+: z ~> xs :+: (z + y)
-                result = NumberNode(arg1.value + arg2.value)
-                self.tree = BinaryNode(rest, result)
-
-            case BinaryOp.SUB:
-                # minus: xs :+: y :+: z ~> xs :+: (z - y)
-                result = NumberNode(arg1.value - arg2.value)
-                self.tree = BinaryNode(rest, result)
-
-            case BinaryOp.MUL:
-                # times: xs :+: y :+: z ~> xs :+: (z * y)
-                result = NumberNode(arg1.value * arg2.value)
-                self.tree = BinaryNode(rest, result)
-
-            case BinaryOp.DIV:
-                # times: xs :+: y :+: z ~> xs :+: (z / y)
-                result = NumberNode(arg1.value // arg2.value)
-                self.tree = BinaryNode(rest, result)
-
-    def execute_ternary_op(self, op: BinaryOp):
-        assert isinstance(self.tree, BinaryNode), f"Operation '{op.value}' requires an argument"
-        assert isinstance(self.tree.left, BinaryNode), f"Operation '{op.value}' requires two arguments"
-        assert isinstance(self.tree.left.left, BinaryNode), f"Operation '{op.value}' requires three arguments"
-        arg1 = self.tree.right
-        arg2 = self.tree.left.right
-        arg3 = self.tree.left.left.right
-        rest = self.tree.left.left.left
-
-        match op:
-            case TernaryOp.PICK:
-                if arg1.value == 0:
-                    self.tree = BinaryNode(rest, arg2)
-                else:
-                    self.tree = BinaryNode(rest, arg3)
-
-    def execute_jump(self, value: JumpOp):
-        match value:
-            case JumpOp.JUMP:
-                # jump: xs :+: n ~> xs and update IP to be n
-                assert isinstance(self.tree, BinaryNode), "Operation 'jump' requires an argument"
-                assert isinstance(self.tree.right, NumberNode), "Operation 'jump' requires a numeric argument"
-                self.ip = self.tree.right.value
-                self.tree = self.tree.left
-
-            case JumpOp.QUIT:
-                self.ip = len(self.code)
+    def interpret(self, count=None):
+        """Run up to `count` instructions with the Python handlers, or until the program ends."""
+        handlers = _JIT_HANDLERS if self.jit else _HANDLERS
+        opcodes = self.opcodes
+        n = len(opcodes)
+        ip = self.ip
+        steps = 0
+        try:
+            # Separate loops keep the step limit out of the unlimited one.
+            if count is None:
+                while ip < n:
+                    ip = handlers[opcodes[ip]](self, ip)
+                    steps += 1
+            else:
+                while ip < n and steps < count:
+                    ip = handlers[opcodes[ip]](self, ip)
+                    steps += 1
+        finally:
+            self.ip = ip
+            self.total_steps += steps
+
+    def require(self, count, name):
+        """Make sure the top `count` cells are on the stack for the operation `name`."""
+        # Only reached when the stack is short, so this check stays under -O.
+        if not self.unfold(count):
+            raise AssertionError(f"Operation '{name}' requires {ARGUMENT_COUNTS[count]}")
+
+    def unfold(self, count):
+        """Move cells out of the base tree until there are `count`; returns False if it runs out."""
+        kinds = self.kinds
+        vals = self.vals
+        while len(kinds) < count:
+            if self.base_kind != K_PAIR:
+                return False
+            left_kind, left, right_kind, right = self.base_val
+            kinds.insert(0, right_kind)
+            vals.insert(0, right)
+            self.base_kind = left_kind
+            self.base_val = left
+        return True
+
+    def freeze(self, count):
+        """Fold the bottom `count` cells into the base tree so that it can be shared."""
+        kinds = self.kinds
+        vals = self.vals
+        kind = self.base_kind
+        value = self.base_val
+        for i in range(count):
+            value = (kind, value, kinds[i], vals[i])
+            kind = K_PAIR
+        del kinds[:count]
+        del vals[:count]
+        self.base_kind = kind
+        self.base_val = value
+
+
+# Instruction handlers.  Each takes the simulator and the address of the
+# instruction and returns the address of the next one to execute.  The type
+# checks on the arguments are asserts, so `python -O` skips them; programs
+# that apply an operation to the wrong kind of tree then fail with a plain
+# TypeError, or not at all.
+
+def _h_push_num(sim, ip):
+    # n: xs ~> xs :+: n
+    sim.kinds.append(K_NUM)
+    sim.vals.append(sim.operands[ip])
+    return ip + 1
+
+
+def _h_push_nil(sim, ip):
+    # nil: xs ~> xs :+: nil
+    sim.kinds.append(K_NIL)
+    sim.vals.append(None)
+    return ip + 1
+
+
+def _h_push_pair(sim, ip):
+    sim.kinds.append(K_PAIR)
+    sim.vals.append(sim.operands[ip])
+    return ip + 1
+
+
+def _h_right(sim, ip):
+    # right: xs :+: ys ~> ys
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'right')
+    vals = sim.vals
+    sim.base_kind = kinds[-1]
+    sim.base_val = vals[-1]
+    del kinds[:]
+    del vals[:]
+    return ip + 1
+
+
+def _h_left(sim, ip):
+    # left: xs :+: ys ~> xs
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'left')
+    kinds.pop()
+    sim.vals.pop()
+    return ip + 1
+
+
+def _h_rec_left(sim, ip):
+    # rec_left: xs :+: n ~> xs :+: ys, where ys is the nth left child of xs
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'rec_left')
+    assert kinds[-1] == K_NUM, "Operation 'rec_left' requires a numeric argument"
+    vals = sim.vals
+    n = max(vals[-1], 0)
+    depth = len(kinds) - 1
+    if n <= depth:
+        sim.freeze(depth - n)
+        kind = sim.base_kind
+        value = sim.base_val
+    else:
+        kind = sim.base_kind
+        value = sim.base_val
+        for _ in range(n - depth):
+            assert kind == K_PAIR, "Operation 'rec_left' invoked with too great a depth"
+            kind, value = value[0], value[1]
+    kinds[-1] = kind
+    vals[-1] = value
+    return ip + 1
+
+
+def _h_left_on_right(sim, ip):
+    # left_on_right: xs :+: (ys :+: zs) ~> xs :+: ys
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'left_on_right')
+    assert kinds[-1] == K_PAIR, "Operation 'left_on_right' requires a binary argument"
+    vals = sim.vals
+    pair = vals[-1]
+    kinds[-1] = pair[0]
+    vals[-1] = pair[1]
+    return ip + 1
+
+
+def _h_right_on_right(sim, ip):
+    # right_on_right: xs :+: (ys :+: zs) ~> xs :+: zs
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'right_on_right')
+    assert kinds[-1] == K_PAIR, "Operation 'right_on_right' requires a binary argument"
+    vals = sim.vals
+    pair = vals[-1]
+    kinds[-1] = pair[2]
+    vals[-1] = pair[3]
+    return ip + 1
+
+
+def _h_unpair(sim, ip):
+    # unpair: xs :+: (ys :+: zs) ~> xs :+: ys :+: zs
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'unpair')
+    assert kinds[-1] == K_PAIR, "Operation 'unpair' requires a binary argument"
+    vals = sim.vals
+    left_kind, left, right_kind, right = vals[-1]
+    kinds[-1] = left_kind
+    vals[-1] = left
+    kinds.append(right_kind)
+    vals.append(right)
+    return ip + 1
+
+
+def _h_q(sim, ip):
+    # Q: xs :+: n ~> xs :+: Q(n)
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'Q')
+    assert kinds[-1] == K_NUM, "Operation 'Q' requires a numeric argument"
+    vals = sim.vals
+    n = vals[-1]
+    data = sim.data
+    if n < len(data):
+        vals[-1] = data[n]
+    else:
+        vals[-1] = 0
+    return ip + 1
+
+
+def _h_print(sim, ip):
+    # print: xs :+: n ~> xs
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'print')
+    assert kinds[-1] == K_NUM, "Operation 'print' requires a numeric argument"
+    kinds.pop()
+    n = sim.vals.pop()
+    if not 0 <= n <= MAX_CODE_POINT:
+        raise ValueError(f"Operation 'print' requires a character code, got {n}")
+    sim.output.append(n)
+    return ip + 1
+
+
+def _h_pair(sim, ip):
+    # pair: xs :+: ys :+: zs ~> xs :+: (ys :+: zs)
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        sim.require(2, 'pair')
+    vals = sim.vals
+    arg1_kind = kinds.pop()
+    arg1 = vals.pop()
+    vals[-1] = (kinds[-1], vals[-1], arg1_kind, arg1)
+    kinds[-1] = K_PAIR
+    return ip + 1
+
+
+def _h_add(sim, ip):
+    # add: xs :+: y :+: z ~> xs :+: (z + y)
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        sim.require(2, 'add')
+    assert kinds[-1] == K_NUM and kinds[-2] == K_NUM, "Operation 'add' requires numeric arguments"
+    vals = sim.vals
+    kinds.pop()
+    arg1 = vals.pop()
+    vals[-1] = arg1 + vals[-1]
+    return ip + 1
+
+
+def _h_sub(sim, ip):
+    # sub: xs :+: y :+: z ~> xs :+: (z - y)
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        sim.require(2, 'sub')
+    assert kinds[-1] == K_NUM and kinds[-2] == K_NUM, "Operation 'sub' requires numeric arguments"
+    vals = sim.vals
+    kinds.pop()
+    arg1 = vals.pop()
+    vals[-1] = arg1 - vals[-1]
+    return ip + 1
+
+
+def _h_mul(sim, ip):
+    # mul: xs :+: y :+: z ~> xs :+: (z * y)
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        sim.require(2, 'mul')
+    assert kinds[-1] == K_NUM and kinds[-2] == K_NUM, "Operation 'mul' requires numeric arguments"
+    vals = sim.vals
+    kinds.pop()
+    arg1 = vals.pop()
+    vals[-1] = arg1 * vals[-1]
+    return ip + 1
+
+
+def _h_div(sim, ip):
+    # div: xs :+: y :+: z ~> xs :+: (z / y)
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        sim.require(2, 'div')
+    assert kinds[-1] == K_NUM and kinds[-2] == K_NUM, "Operation 'div' requires numeric arguments"
+    vals = sim.vals
+    kinds.pop()
+    arg1 = vals.pop()
+    vals[-1] = arg1 // vals[-1]
+    return ip + 1
+
+
+def _h_pick(sim, ip):
+    # pick: xs :+: z :+: y :+: n ~> xs :+: (y if n == 0 else z)
+    kinds = sim.kinds
+    if len(kinds) < 3:
+        sim.require(3, 'pick')
+    assert kinds[-1] == K_NUM, "Operation 'pick' requires a numeric argument"
+    vals = sim.vals
+    kinds.pop()
+    cond = vals.pop()
+    arg2_kind = kinds.pop()
+    arg2 = vals.pop()
+    if cond == 0:
+        kinds[-1] = arg2_kind
+        vals[-1] = arg2
+    return ip + 1
+
+
+def _h_jump(sim, ip):
+    # jump: xs :+: n ~> xs and update IP to be n
+    kinds = sim.kinds
+    if not kinds:
+        sim.require(1, 'jump')
+    assert kinds[-1] == K_NUM, "Operation 'jump' requires a numeric argument"
+    kinds.pop()
+    return sim.vals.pop()
+
+
+def _h_quit(sim, ip):
+    return len(sim.opcodes)
+
+
+# Superinstruction handlers execute two instructions, so they count an
+# extra step.  When the fast path doesn't apply they fall back to running
+# both original handlers, which also produces the original error messages.
+
+def _h_jump_imm(sim, ip):
+    # n jump: xs ~> xs and update IP to be n
+    sim.total_steps += 1
+    return sim.operands[ip]
+
+
+def _h_add_imm(sim, ip):
+    # n add: xs :+: m ~> xs :+: (n + m)
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if not kinds or kinds[-1] != K_NUM:
+        return _h_add(sim, _h_push_num(sim, ip))
+    vals = sim.vals
+    vals[-1] = sim.operands[ip] + vals[-1]
+    return ip + 2
+
+
+def _h_sub_imm(sim, ip):
+    # n sub: xs :+: m ~> xs :+: (n - m)
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if not kinds or kinds[-1] != K_NUM:
+        return _h_sub(sim, _h_push_num(sim, ip))
+    vals = sim.vals
+    vals[-1] = sim.operands[ip] - vals[-1]
+    return ip + 2
+
+
+def _h_mul_imm(sim, ip):
+    # n mul: xs :+: m ~> xs :+: (n * m)
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if not kinds or kinds[-1] != K_NUM:
+        return _h_mul(sim, _h_push_num(sim, ip))
+    vals = sim.vals
+    vals[-1] = sim.operands[ip] * vals[-1]
+    return ip + 2
+
+
+def _h_div_imm(sim, ip):
+    # n div: xs :+: m ~> xs :+: (n / m)
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if not kinds or kinds[-1] != K_NUM:
+        return _h_div(sim, _h_push_num(sim, ip))
+    vals = sim.vals
+    vals[-1] = sim.operands[ip] // vals[-1]
+    return ip + 2
+
+
+def _h_q_imm(sim, ip):
+    # n Q: xs ~> xs :+: Q(n)
+    sim.total_steps += 1
+    n = sim.operands[ip]
+    data = sim.data
+    sim.kinds.append(K_NUM)
+    if n < len(data):
+        sim.vals.append(data[n])
+    else:
+        sim.vals.append(0)
+    return ip + 2
+
+
+# Pairs that are taken apart again right away are never built.
+
+def _h_pair_right_on_right(sim, ip):
+    # pair right_on_right: xs :+: y :+: z ~> xs :+: z
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        return _h_right_on_right(sim, _h_pair(sim, ip))
+    del kinds[-2]
+    del sim.vals[-2]
+    return ip + 2
+
+
+def _h_pair_left_on_right(sim, ip):
+    # pair left_on_right: xs :+: y :+: z ~> xs :+: y
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if len(kinds) < 2:
+        return _h_left_on_right(sim, _h_pair(sim, ip))
+    kinds.pop()
+    sim.vals.pop()
+    return ip + 2
+
+
+def _h_unpair_pair(sim, ip):
+    # unpair pair: xs :+: (y :+: z) ~> xs :+: (y :+: z)
+    sim.total_steps += 1
+    kinds = sim.kinds
+    if not kinds or kinds[-1] != K_PAIR:
+        return _h_pair(sim, _h_unpair(sim, ip))
+    return ip + 2
+
+
+def build_handler_table():
+    handlers = {
+        OP_RIGHT_ON_RIGHT: _h_right_on_right,
+        OP_PAIR: _h_pair,
+        OP_PUSH_NUM: _h_push_num,
+        OP_REC_LEFT: _h_rec_left,
+        OP_PUSH_NIL: _h_push_nil,
+        OP_RIGHT: _h_right,
+        OP_LEFT_ON_RIGHT: _h_left_on_right,
+        OP_JUMP: _h_jump,
+        OP_LEFT: _h_left,
+        OP_PICK: _h_pick,
+        OP_SUB_IMM: _h_sub_imm,
+        OP_ADD_IMM: _h_add_imm,
+        OP_Q_IMM: _h_q_imm,
+        OP_JUMP_IMM: _h_jump_imm,
+        OP_PAIR_RIGHT_ON_RIGHT: _h_pair_right_on_right,
+        OP_PAIR_LEFT_ON_RIGHT: _h_pair_left_on_right,
+        OP_UNPAIR_PAIR: _h_unpair_pair,
+        OP_ADD: _h_add,
+        OP_SUB: _h_sub,
+        OP_PRINT: _h_print,
+        OP_MUL: _h_mul,
+        OP_Q: _h_q,
+        OP_DIV: _h_div,
+        OP_MUL_IMM: _h_mul_imm,
+        OP_DIV_IMM: _h_div_imm,
+        OP_UNPAIR: _h_unpair,
+        OP_PUSH_PAIR: _h_push_pair,
+        OP_QUIT: _h_quit,
+    }
+    return [handlers[op] for op in range(len(handlers))]
+
+
+_HANDLERS = build_handler_table()
+
+
+# Hot loop compilation.  When jit is enabled, every backward jump is counted
+# per target, and once a target has been jumped back to HOT_LOOP_THRESHOLD
+# times, the instructions from it up to the jump are compiled with Numba if
+# they only do arithmetic on numbers.  The loop head is then patched to
+# OP_HOTSPOT, which runs the compiled loop until the jump goes elsewhere.
+
+HOT_LOOP_THRESHOLD = 50
+
+# Compiled loops work on int64.  Every value they produce is kept within
+# TRACE_LIMIT so that additions can't overflow, and products need both
+# factors below TRACE_MUL_LIMIT.  Anything outside those bounds raises, and
+# the loop is then left to the Python handlers, which use unbounded ints.
+TRACE_LIMIT = 2 ** 61
+TRACE_MUL_LIMIT = 2 ** 30
+
+# (pops, pushes) of the instructions a compiled loop may contain.
+TRACE_EFFECTS = {
+    OP_PUSH_NUM: (0, 1),
+    OP_LEFT: (1, 0),
+    OP_Q: (1, 1),
+    OP_ADD: (2, 1),
+    OP_SUB: (2, 1),
+    OP_MUL: (2, 1),
+    OP_DIV: (2, 1),
+    OP_PICK: (3, 1),
+    OP_ADD_IMM: (1, 1),
+    OP_SUB_IMM: (1, 1),
+    OP_MUL_IMM: (1, 1),
+    OP_DIV_IMM: (1, 1),
+    OP_Q_IMM: (0, 1),
+}
+
+# `n rec_left right_on_right` copies the cell n below the top; compiled
+# loops treat it as a single pseudo-instruction.
+TRACE_COPY = -1
+
+TRACE_OPERATORS = {
+    OP_ADD: '+', OP_SUB: '-', OP_MUL: '*', OP_DIV: '//',
+    OP_ADD_IMM: '+', OP_SUB_IMM: '-', OP_MUL_IMM: '*', OP_DIV_IMM: '//',
+}
+
+
+class Trace:
+    """A compiled loop: `function` runs it on the top `depth` cells."""
+
+    def __init__(self, function, depth, steps, opcode):
+        self.function = function
+        self.depth = depth
+        self.steps = steps
+        self.opcode = opcode
+
+
+def trace_source(body, depth):
+    """Python source of a Numba function running `body` in a loop.
+
+    The stack cells are kept in locals s0, s1, ...; the bottom `depth` are
+    loaded from and stored back to the `frame` array.
+    """
+    lines = [
+        'def trace(frame, data, head):',
+        '    size = data.shape[0]',
+        '    iterations = 0',
+    ]
+    lines += [f'    s{i} = frame[{i}]' for i in range(depth)]
+    lines += [
+        '    while True:',
+        '        iterations += 1',
+    ]
+
+    def check(var):
+        lines.append(f'        if {var} > {TRACE_LIMIT} or {var} < -{TRACE_LIMIT}:')
+        lines.append('            raise OverflowError()')
+
+    def load(var, index):
+        lines.append(f'        if {index} < size:')
+        lines.append(f'            if {index} < -size:')
+        lines.append('                raise IndexError()')
+        lines.append(f'            {var} = data[{index}]')
+        lines.append('        else:')
+        lines.append(f'            {var} = 0')
+        check(var)
+
+    def arithmetic(op, target, left, right):
+        if op in (OP_MUL, OP_MUL_IMM):
+            lines.append(f'        if abs({left}) >= {TRACE_MUL_LIMIT} or abs({right}) >= {TRACE_MUL_LIMIT}:')
+            lines.append('            raise OverflowError()')
+        lines.append(f'        {target} = {left} {TRACE_OPERATORS[op]} {right}')
+        check(target)
+
+    h = depth
+    for op, operand in body:
+        if op == OP_PUSH_NUM:
+            lines.append(f'        s{h} = {operand}')
+        elif op == OP_LEFT:
+            pass
+        elif op == OP_Q:
+            load(f's{h - 1}', f's{h - 1}')
+        elif op == OP_Q_IMM:
+            load(f's{h}', operand)
+        elif op in (OP_ADD, OP_SUB, OP_MUL, OP_DIV):
+            arithmetic(op, f's{h - 2}', f's{h - 1}', f's{h - 2}')
+        elif op in (OP_ADD_IMM, OP_SUB_IMM, OP_MUL_IMM, OP_DIV_IMM):
+            arithmetic(op, f's{h - 1}', operand, f's{h - 1}')
+        elif op == OP_PICK:
+            lines.append(f'        if s{h - 1} == 0:')
+            lines.append(f'            s{h - 3} = s{h - 2}')
+        elif op == TRACE_COPY:
+            lines.append(f'        s{h} = s{h - 1 - operand}')
+            h += 1
+            continue
+        pops, pushes = TRACE_EFFECTS[op]
+        h += pushes - pops
+
+    lines.append(f'        if s{h - 1} != head:')
+    lines += [f'            frame[{i}] = s{i}' for i in range(depth)]
+    lines.append(f'            return s{h - 1}, iterations')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_trace(opcodes, operands, head, jump_ip):
+    """Compile the loop from `head` to the jump at `jump_ip`, or return None if it isn't numeric.
+
+    Only loops whose body uses the instructions in TRACE_EFFECTS (plus the
+    TRACE_COPY idiom), ends in a `jump`, and leaves the stack as deep as it
+    found it are compiled.
+    """
+    import numba
+
+    body = []
+    steps = 1
+    ip = head
+    while ip < jump_ip:
+        op = opcodes[ip]
+        if op == OP_PUSH_NUM and ip + 2 < jump_ip \
+                and opcodes[ip + 1] == OP_REC_LEFT and opcodes[ip + 2] == OP_RIGHT_ON_RIGHT:
+            body.append((TRACE_COPY, operands[ip]))
+            ip += 3
+            steps += 3
+            continue
+        if op not in TRACE_EFFECTS:
+            return None
+        body.append((op, operands[ip]))
+        if op in SUPERINSTRUCTIONS.values():
+            ip += 2
+            steps += 2
+        else:
+            ip += 1
+            steps += 1
+    if ip != jump_ip or opcodes[jump_ip] != OP_JUMP:
+        return None
+    if any(operand is not None and abs(operand) > TRACE_LIMIT for _, operand in body):
+        return None
+
+    height = lowest = 0
+    for op, operand in body:
+        if op == TRACE_COPY:
+            lowest = min(lowest, height - 1 - operand)
+            height += 1
+            continue
+        pops, pushes = TRACE_EFFECTS[op]
+        lowest = min(lowest, height - pops)
+        height += pushes - pops
+    lowest = min(lowest, height - 1)
+    if height != 1:
+        return None
+
+    namespace = {}
+    exec(trace_source(body, -lowest), namespace)
+    return Trace(numba.njit(namespace['trace']), -lowest, steps, opcodes[head])
+
+
+def _h_jump_counted(sim, ip):
+    target = _h_jump(sim, ip)
+    if 0 <= target < ip:
+        count = sim.loop_counts[target] + 1
+        sim.loop_counts[target] = count
+        if count == HOT_LOOP_THRESHOLD:
+            trace = compile_trace(sim.opcodes, sim.operands, target, ip)
+            if trace is not None:
+                sim.traces[target] = trace
+                sim.opcodes[target] = OP_HOTSPOT
+    return target
+
+
+def _h_hotspot(sim, ip):
+    trace = sim.traces[ip]
+    if sim.unfold(trace.depth):
+        kinds = sim.kinds
+        vals = sim.vals
+        start = len(vals) - trace.depth
+        if all(kind == K_NUM for kind in kinds[start:]) \
+                and all(-TRACE_LIMIT <= value <= TRACE_LIMIT for value in vals[start:]):
+            frame = np.array(vals[start:], dtype=np.int64)
+            try:
+                target, iterations = trace.function(frame, np.frombuffer(sim.data, dtype=np.int64), ip)
+            except (ArithmeticError, IndexError):
+                # Let the Python handlers redo the loop from here and deal with it.
+                sim.opcodes[ip] = trace.opcode
+            else:
+                vals[start:] = frame.tolist()
+                sim.total_steps += iterations * trace.steps - 1
+                return int(target)
+    return _HANDLERS[trace.opcode](sim, ip)
+
+
+def build_jit_handler_table():
+    handlers = list(_HANDLERS)
+    handlers[OP_JUMP] = _h_jump_counted
+    handlers.append(_h_hotspot)
+    assert len(handlers) == OP_HOTSPOT + 1
+    return handlers
+
+
+_JIT_HANDLERS = build_jit_handler_table()
 
 
 import re
 
 
-def build_lookup_table():
-    result = {}
-    for enum_type in [UnaryOp, BinaryOp, TernaryOp, JumpOp]:
-        for enum_member in enum_type:
-            result[enum_member.value] = enum_member
-    return result
-
-
-LOOKUP_TABLE = build_lookup_table()
+OP_FROM_STR = {instruction.value: opcode for instruction, opcode in OPCODES.items()}
 
 
 def as_instruction(raw_token):
+    """Lower a single token to an (opcode, operand) pair."""
     if not raw_token:
         raise ValueError("Empty token is not allowed")
     if raw_token.isdigit():
-        return PushOp(NumberNode(int(raw_token)))
+        return OP_PUSH_NUM, int(raw_token)
     if raw_token == 'nil':
-        return PushOp(NilNode())
-    return LOOKUP_TABLE[raw_token]
+        return OP_PUSH_NIL, None
+    return OP_FROM_STR[raw_token], None
+
+
+# A comment runs up to any of the line boundaries str.splitlines knows.
+COMMENT = re.compile(r'//[^\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]*')
 
 
 def parse(code):
-    instructions = []
-    for line in code.splitlines():
-        if '//' in line:
-            line = line[:line.index('//')]
-        line = line.strip()
-        if line:
-            instructions.append(as_instruction(line))
-    return instructions
+    """Parse source code into parallel opcode and operand arrays, like lower.
+
+    Tokens are separated by whitespace, and `//` starts a comment that runs
+    to the end of the line.
+    """
+    if '//' in code:
+        code = COMMENT.sub('', code)
+    tokens = code.split()
+    # Programs reuse a handful of tokens, so each distinct one is lowered once.
+    lowered = {token: as_instruction(token) for token in dict.fromkeys(tokens)}
+    instructions = [lowered[token] for token in tokens]
+    return array('B', [opcode for opcode, _ in instructions]), [operand for _, operand in instructions]
 
 
 import sys
 import argparse
+import importlib.util
+import warnings
+
+
+def read_query_data(text):
+    """Parse whitespace-separated integers into an array('q').
+
+    NumPy's parser is used when it is available, as it is much faster on
+    large data files.  The values still end up in an array('q'): indexing
+    that from Python is cheaper than indexing an ndarray.
+    """
+    data = array('q')
+    tokens = text.split()
+    if np is not None:
+        with warnings.catch_warnings():
+            # NumPy 1.x stops at the first token it can't parse with only a
+            # DeprecationWarning; the count check below catches that.
+            warnings.simplefilter('ignore', DeprecationWarning)
+            try:
+                values = np.fromstring(text, dtype=np.int64, sep=' ')
+            except ValueError:
+                values = None
+        # NumPy also reads a lone sign as 0 and clamps values that don't fit
+        # to the int64 limits, so leave those cases to int() as well.
+        if values is not None and values.size == len(tokens) \
+                and '-' not in tokens and '+' not in tokens:
+            limits = np.iinfo(np.int64)
+            if not (values == limits.max).any() and not (values == limits.min).any():
+                data.frombytes(values.tobytes())
+                return data
+    data.extend(int(x) for x in tokens)
+    return data
+    data.extend(int(x) for x in text.split())
+    return data
 
 
 def main(argv):
     arg_parser = argparse.ArgumentParser(description='Tree-lang interpreter')
     arg_parser.add_argument('file', nargs='?', help='Input file (default: stdin)')
     arg_parser.add_argument('-Q', metavar='filename', help='File with whitespace-separated integers')
+    arg_parser.add_argument('--pure', action='store_true', help='Do not use the compiled simulator_core')
+    arg_parser.add_argument('--jit', action='store_true',
+                            help='Compile hot numeric loops with Numba (implies --pure)')
+    arg_parser.add_argument('--stack-hint', type=int, default=0, metavar='cells',
+                            help='Stack cells for the compiled core to allocate up front')
     args = arg_parser.parse_args(argv[1:])
+    if args.jit and importlib.util.find_spec('numba') is None:
+        arg_parser.error('--jit requires Numba to be installed')
 
     if args.file:
         with open(args.file, 'r') as f:
@@ -299,17 +1169,18 @@ def main(argv):
     query_list = None
     if args.Q:
         with open(args.Q, 'r') as f:
-            query_list = [int(x) for x in f.read().split()]
+            query_list = read_query_data(f.read())
 
-    program = parse(code)
-    interpreter = Simulator(program, query_list)
-    interpreter.run()
+    opcodes, operands = parse(code)
+    interpreter = Simulator(opcodes, operands, query_list, native=not (args.pure or args.jit), jit=args.jit,
+                            stack_hint=args.stack_hint)
+    tree = interpreter.run()
     print(f'ran in {interpreter.total_steps} steps')
-    if isinstance(interpreter.tree, BinaryNode):
-        if isinstance(interpreter.tree.right, NumberNode):
-            print(f"result: {interpreter.tree.right.value}")
+    if isinstance(tree, BinaryNode):
+        if isinstance(tree.right, NumberNode):
+            print(f"result: {tree.right.value}")
     if interpreter.output:
-        print(''.join(interpreter.output))
+        print(''.join(map(chr, interpreter.output)))
 
 
 if __name__ == "__main__":
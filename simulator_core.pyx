@@ -0,0 +1,545 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, initializedcheck=False, cdivision=True
+"""Compiled interpreter loop for simulator.py.
+
+Build it in place with:
+
+    cythonize -i simulator_core.pyx
+
+`run(sim)` executes a Simulator's program on a C stack of int64 numbers and
+kind tags.  Whenever it meets something it doesn't handle (a malformed
+program, a division by zero, a number that doesn't fit in 64 bits), it stops
+before that instruction and hands control back to the Python loop, which
+then produces the usual result or error.
+"""
+
+from cpython.exc cimport PyErr_CheckSignals
+from cpython.mem cimport PyMem_Malloc, PyMem_Realloc, PyMem_Free
+from libc.stdint cimport INT64_MIN
+from libc.string cimport memmove
+from array import array
+
+cdef extern from *:
+    bint add_overflow "__builtin_saddll_overflow"(long long a, long long b, long long *res) nogil
+    bint sub_overflow "__builtin_ssubll_overflow"(long long a, long long b, long long *res) nogil
+    bint mul_overflow "__builtin_smulll_overflow"(long long a, long long b, long long *res) nogil
+
+# Instructions run between checks for Ctrl-C and other signals.
+cdef enum:
+    SIGNAL_INTERVAL = 1 << 16
+
+cdef enum:
+    K_NIL = 0
+    K_NUM = 1
+    K_PAIR = 2
+
+# These must match the OP_* constants in simulator.py, which checks them on
+# import through OPCODES.
+cdef enum:
+    OP_RIGHT_ON_RIGHT = 0
+    OP_PAIR = 1
+    OP_PUSH_NUM = 2
+    OP_REC_LEFT = 3
+    OP_PUSH_NIL = 4
+    OP_RIGHT = 5
+    OP_LEFT_ON_RIGHT = 6
+    OP_JUMP = 7
+    OP_LEFT = 8
+    OP_PICK = 9
+    OP_SUB_IMM = 10
+    OP_ADD_IMM = 11
+    OP_Q_IMM = 12
+    OP_JUMP_IMM = 13
+    OP_PAIR_RIGHT_ON_RIGHT = 14
+    OP_PAIR_LEFT_ON_RIGHT = 15
+    OP_UNPAIR_PAIR = 16
+    OP_ADD = 17
+    OP_SUB = 18
+    OP_PRINT = 19
+    OP_MUL = 20
+    OP_Q = 21
+    OP_DIV = 22
+    OP_MUL_IMM = 23
+    OP_DIV_IMM = 24
+    OP_UNPAIR = 25
+    OP_PUSH_PAIR = 26
+    OP_QUIT = 27
+
+OPCODES = {
+    'OP_RIGHT_ON_RIGHT': OP_RIGHT_ON_RIGHT,
+    'OP_PAIR': OP_PAIR,
+    'OP_PUSH_NUM': OP_PUSH_NUM,
+    'OP_REC_LEFT': OP_REC_LEFT,
+    'OP_PUSH_NIL': OP_PUSH_NIL,
+    'OP_RIGHT': OP_RIGHT,
+    'OP_LEFT_ON_RIGHT': OP_LEFT_ON_RIGHT,
+    'OP_JUMP': OP_JUMP,
+    'OP_LEFT': OP_LEFT,
+    'OP_PICK': OP_PICK,
+    'OP_SUB_IMM': OP_SUB_IMM,
+    'OP_ADD_IMM': OP_ADD_IMM,
+    'OP_Q_IMM': OP_Q_IMM,
+    'OP_JUMP_IMM': OP_JUMP_IMM,
+    'OP_PAIR_RIGHT_ON_RIGHT': OP_PAIR_RIGHT_ON_RIGHT,
+    'OP_PAIR_LEFT_ON_RIGHT': OP_PAIR_LEFT_ON_RIGHT,
+    'OP_UNPAIR_PAIR': OP_UNPAIR_PAIR,
+    'OP_ADD': OP_ADD,
+    'OP_SUB': OP_SUB,
+    'OP_PRINT': OP_PRINT,
+    'OP_MUL': OP_MUL,
+    'OP_Q': OP_Q,
+    'OP_DIV': OP_DIV,
+    'OP_MUL_IMM': OP_MUL_IMM,
+    'OP_DIV_IMM': OP_DIV_IMM,
+    'OP_UNPAIR': OP_UNPAIR,
+    'OP_PUSH_PAIR': OP_PUSH_PAIR,
+    'OP_QUIT': OP_QUIT,
+}
+
+cdef bint as_int64(object value, long long *out):
+    """Store `value` in `out`, returning False if it doesn't fit in 64 bits."""
+    try:
+        out[0] = value
+    except OverflowError:
+        return False
+    return True
+
+
+cdef bint floor_div(long long a, long long b, long long *out):
+    """Python's a // b; returns False on division by zero or overflow."""
+    if b == 0 or (a == INT64_MIN and b == -1):
+        return False
+    cdef long long q = a / b
+    if (a % b != 0) and ((a < 0) != (b < 0)):
+        q -= 1
+    out[0] = q
+    return True
+
+
+cdef class Stack:
+    """The simulator's cells in C arrays.
+
+    `kinds` and `ints` hold the tag and numeric payload of each cell, `objs`
+    the payload of nil and pair cells.  `objs` is kept as long as the
+    capacity, and slots of number cells are simply left stale.
+    """
+    cdef signed char *kinds
+    cdef long long *ints
+    cdef list objs
+    cdef Py_ssize_t sp
+    cdef Py_ssize_t cap
+    cdef int base_kind
+    cdef object base_val
+
+    def __cinit__(self, Py_ssize_t cap):
+        if cap < 16:
+            cap = 16
+        self.kinds = <signed char *> PyMem_Malloc(cap * sizeof(signed char))
+        self.ints = <long long *> PyMem_Malloc(cap * sizeof(long long))
+        if self.kinds == NULL or self.ints == NULL:
+            raise MemoryError()
+        self.objs = [None] * cap
+        self.sp = 0
+        self.cap = cap
+
+    def __dealloc__(self):
+        PyMem_Free(self.kinds)
+        PyMem_Free(self.ints)
+
+    cdef int reserve(self, Py_ssize_t extra) except -1:
+        if self.sp + extra <= self.cap:
+            return 0
+        cdef Py_ssize_t cap = max(self.cap * 2, self.sp + extra)
+        cdef signed char *kinds = <signed char *> PyMem_Realloc(self.kinds, cap * sizeof(signed char))
+        if kinds == NULL:
+            raise MemoryError()
+        self.kinds = kinds
+        cdef long long *ints = <long long *> PyMem_Realloc(self.ints, cap * sizeof(long long))
+        if ints == NULL:
+            raise MemoryError()
+        self.ints = ints
+        self.objs.extend([None] * (cap - self.cap))
+        self.cap = cap
+        return 0
+
+    cdef object value(self, Py_ssize_t i):
+        if self.kinds[i] == K_NUM:
+            return self.ints[i]
+        return self.objs[i]
+
+    cdef bint set(self, Py_ssize_t i, int kind, object value):
+        """Overwrite cell `i`; returns False (leaving it alone) if a number doesn't fit."""
+        if kind == K_NUM:
+            if not as_int64(value, &self.ints[i]):
+                return False
+        else:
+            self.objs[i] = value
+        self.kinds[i] = kind
+        return True
+
+    cdef int push(self, int kind, object value) except -1:
+        """Push a cell; returns 0 (pushing nothing) if a number doesn't fit."""
+        self.reserve(1)
+        if not self.set(self.sp, kind, value):
+            return 0
+        self.sp += 1
+        return 1
+
+    cdef int unfold(self, Py_ssize_t count) except -1:
+        """Pull cells out of the base tree until there are `count` of them.
+
+        Returns 0 if the base runs out first; the cells unfolded so far stay,
+        which still describes the same tree.
+        """
+        cdef long long number = 0
+        while self.sp < count:
+            if self.base_kind != K_PAIR:
+                return 0
+            left_kind, left, right_kind, right = <tuple> self.base_val
+            if right_kind == K_NUM and not as_int64(right, &number):
+                return 0
+            self.reserve(1)
+            memmove(self.kinds + 1, self.kinds, self.sp * sizeof(signed char))
+            memmove(self.ints + 1, self.ints, self.sp * sizeof(long long))
+            self.objs[1:self.sp + 1] = self.objs[0:self.sp]
+            self.kinds[0] = right_kind
+            self.ints[0] = number
+            self.objs[0] = right
+            self.sp += 1
+            self.base_kind = left_kind
+            self.base_val = left
+        return 1
+
+    cdef int freeze(self, Py_ssize_t count) except -1:
+        """Fold the bottom `count` cells into the base tree."""
+        cdef Py_ssize_t i
+        cdef int kind = self.base_kind
+        cdef object value = self.base_val
+        for i in range(count):
+            value = (kind, value, self.kinds[i], self.value(i))
+            kind = K_PAIR
+        self.base_kind = kind
+        self.base_val = value
+        if count == 0:
+            return 0
+        self.sp -= count
+        memmove(self.kinds, self.kinds + count, self.sp * sizeof(signed char))
+        memmove(self.ints, self.ints + count, self.sp * sizeof(long long))
+        self.objs[0:self.sp] = self.objs[count:count + self.sp]
+        return 0
+
+
+cdef Stack load_stack(sim):
+    """Copy the simulator's cells into a Stack, or return None if a number doesn't fit."""
+    kinds = sim.kinds
+    vals = sim.vals
+    cdef Stack stack = Stack(max(len(kinds) * 2, sim.stack_hint))
+    for kind, value in zip(kinds, vals):
+        if not stack.push(kind, value):
+            return None
+    stack.base_kind = sim.base_kind
+    stack.base_val = sim.base_val
+    return stack
+
+
+cdef void store_stack(Stack stack, sim):
+    cdef Py_ssize_t i
+    kinds = array('b')
+    kinds.frombytes((<char *> stack.kinds)[:stack.sp])
+    sim.kinds = kinds
+    sim.vals = [stack.value(i) for i in range(stack.sp)]
+    sim.base_kind = stack.base_kind
+    sim.base_val = stack.base_val
+
+
+def run(sim):
+    """Run `sim` from its current instruction until the program ends or needs the Python loop."""
+    cdef const unsigned char[:] opcodes = sim.opcodes
+    cdef const long long[:] data = sim.data
+    cdef list operands = sim.operands
+    output = sim.output
+    cdef Py_ssize_t n = opcodes.shape[0]
+    cdef Py_ssize_t data_size = data.shape[0]
+    cdef Py_ssize_t ip = sim.ip
+    cdef Py_ssize_t i, depth
+    cdef long long steps = 0
+    cdef int countdown = SIGNAL_INTERVAL
+    cdef long long a, b, r, mask
+    cdef int kind
+    cdef unsigned char op
+    cdef tuple pair
+    cdef object value
+
+    cdef Stack st = load_stack(sim)
+    if st is None:
+        return
+
+    # Numeric operands, unboxed once up front.
+    cdef long long *imm = <long long *> PyMem_Malloc((n + 1) * sizeof(long long))
+    if imm == NULL:
+        raise MemoryError()
+    for i in range(n):
+        imm[i] = 0
+        if type(operands[i]) is int and not as_int64(operands[i], &imm[i]):
+            PyMem_Free(imm)
+            return
+
+    try:
+        while 0 <= ip < n:
+            countdown -= 1
+            if countdown == 0:
+                countdown = SIGNAL_INTERVAL
+                PyErr_CheckSignals()
+            op = opcodes[ip]
+            if op == OP_PUSH_NUM:
+                st.reserve(1)
+                st.kinds[st.sp] = K_NUM
+                st.ints[st.sp] = imm[ip]
+                st.sp += 1
+                ip += 1
+
+            elif op == OP_PUSH_NIL:
+                st.reserve(1)
+                st.kinds[st.sp] = K_NIL
+                st.objs[st.sp] = None
+                st.sp += 1
+                ip += 1
+
+            elif op == OP_PUSH_PAIR:
+                st.reserve(1)
+                st.kinds[st.sp] = K_PAIR
+                st.objs[st.sp] = operands[ip]
+                st.sp += 1
+                ip += 1
+
+            elif op == OP_RIGHT:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                st.base_kind = st.kinds[st.sp - 1]
+                st.base_val = st.value(st.sp - 1)
+                st.sp = 0
+                ip += 1
+
+            elif op == OP_LEFT:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                st.sp -= 1
+                ip += 1
+
+            elif op == OP_REC_LEFT:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM:
+                    break
+                a = st.ints[st.sp - 1]
+                if a < 0:
+                    a = 0
+                depth = st.sp - 1
+                if a <= depth:
+                    st.freeze(depth - a)
+                    kind = st.base_kind
+                    value = st.base_val
+                else:
+                    kind = st.base_kind
+                    value = st.base_val
+                    while a > depth and kind == K_PAIR:
+                        pair = <tuple> value
+                        kind = pair[0]
+                        value = pair[1]
+                        a -= 1
+                    if a > depth:
+                        break
+                if not st.set(st.sp - 1, kind, value):
+                    break
+                ip += 1
+
+            elif op == OP_LEFT_ON_RIGHT:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_PAIR:
+                    break
+                pair = <tuple> st.objs[st.sp - 1]
+                if not st.set(st.sp - 1, pair[0], pair[1]):
+                    break
+                ip += 1
+
+            elif op == OP_RIGHT_ON_RIGHT:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_PAIR:
+                    break
+                pair = <tuple> st.objs[st.sp - 1]
+                if not st.set(st.sp - 1, pair[2], pair[3]):
+                    break
+                ip += 1
+
+            elif op == OP_UNPAIR:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_PAIR:
+                    break
+                pair = <tuple> st.objs[st.sp - 1]
+                if pair[2] == K_NUM and not as_int64(pair[3], &r):
+                    break
+                if not st.set(st.sp - 1, pair[0], pair[1]):
+                    break
+                st.push(pair[2], pair[3])
+                ip += 1
+
+            elif op == OP_Q:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM:
+                    break
+                a = st.ints[st.sp - 1]
+                if a < data_size:
+                    if a < 0:
+                        a += data_size
+                        if a < 0:
+                            break
+                    st.ints[st.sp - 1] = data[a]
+                else:
+                    st.ints[st.sp - 1] = 0
+                ip += 1
+
+            elif op == OP_PRINT:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM:
+                    break
+                a = st.ints[st.sp - 1]
+                if a < 0 or a > 0x10FFFF:
+                    break
+                output.append(a)
+                st.sp -= 1
+                ip += 1
+
+            elif op == OP_PAIR:
+                if st.sp < 2 and not st.unfold(2):
+                    break
+                pair = (st.kinds[st.sp - 2], st.value(st.sp - 2), st.kinds[st.sp - 1], st.value(st.sp - 1))
+                st.sp -= 1
+                st.kinds[st.sp - 1] = K_PAIR
+                st.objs[st.sp - 1] = pair
+                ip += 1
+
+            elif op == OP_ADD or op == OP_SUB or op == OP_MUL or op == OP_DIV:
+                if st.sp < 2 and not st.unfold(2):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM or st.kinds[st.sp - 2] != K_NUM:
+                    break
+                a = st.ints[st.sp - 1]
+                b = st.ints[st.sp - 2]
+                if op == OP_ADD:
+                    if add_overflow(a, b, &r):
+                        break
+                elif op == OP_SUB:
+                    if sub_overflow(a, b, &r):
+                        break
+                elif op == OP_MUL:
+                    if mul_overflow(a, b, &r):
+                        break
+                elif not floor_div(a, b, &r):
+                    break
+                st.sp -= 1
+                st.ints[st.sp - 1] = r
+                ip += 1
+
+            elif op == OP_PICK:
+                if st.sp < 3 and not st.unfold(3):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM:
+                    break
+                # Branchless select on the C arrays, as the condition is
+                # often data dependent; only object payloads need a branch.
+                mask = -<long long> (st.ints[st.sp - 1] == 0)
+                st.ints[st.sp - 3] = (st.ints[st.sp - 2] & mask) | (st.ints[st.sp - 3] & ~mask)
+                st.kinds[st.sp - 3] = <signed char> ((st.kinds[st.sp - 2] & mask) | (st.kinds[st.sp - 3] & ~mask))
+                if st.kinds[st.sp - 2] != K_NUM and mask:
+                    st.objs[st.sp - 3] = st.objs[st.sp - 2]
+                st.sp -= 2
+                ip += 1
+
+            elif op == OP_JUMP:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM:
+                    break
+                st.sp -= 1
+                ip = <Py_ssize_t> st.ints[st.sp]
+
+            elif op == OP_QUIT:
+                ip = n
+
+            elif op == OP_JUMP_IMM:
+                steps += 1
+                ip = <Py_ssize_t> imm[ip]
+
+            elif op == OP_ADD_IMM or op == OP_SUB_IMM or op == OP_MUL_IMM or op == OP_DIV_IMM:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_NUM:
+                    break
+                a = imm[ip]
+                b = st.ints[st.sp - 1]
+                if op == OP_ADD_IMM:
+                    if add_overflow(a, b, &r):
+                        break
+                elif op == OP_SUB_IMM:
+                    if sub_overflow(a, b, &r):
+                        break
+                elif op == OP_MUL_IMM:
+                    if mul_overflow(a, b, &r):
+                        break
+                elif not floor_div(a, b, &r):
+                    break
+                st.ints[st.sp - 1] = r
+                steps += 1
+                ip += 2
+
+            elif op == OP_Q_IMM:
+                a = imm[ip]
+                if a < 0:
+                    a += data_size
+                    if a < 0:
+                        break
+                st.reserve(1)
+                st.kinds[st.sp] = K_NUM
+                st.ints[st.sp] = data[a] if a < data_size else 0
+                st.sp += 1
+                steps += 1
+                ip += 2
+
+            elif op == OP_PAIR_RIGHT_ON_RIGHT:
+                if st.sp < 2 and not st.unfold(2):
+                    break
+                st.kinds[st.sp - 2] = st.kinds[st.sp - 1]
+                st.ints[st.sp - 2] = st.ints[st.sp - 1]
+                st.objs[st.sp - 2] = st.objs[st.sp - 1]
+                st.sp -= 1
+                steps += 1
+                ip += 2
+
+            elif op == OP_PAIR_LEFT_ON_RIGHT:
+                if st.sp < 2 and not st.unfold(2):
+                    break
+                st.sp -= 1
+                steps += 1
+                ip += 2
+
+            elif op == OP_UNPAIR_PAIR:
+                if st.sp < 1 and not st.unfold(1):
+                    break
+                if st.kinds[st.sp - 1] != K_PAIR:
+                    break
+                steps += 1
+                ip += 2
+
+            else:
+                break
+
+            steps += 1
+    finally:
+        PyMem_Free(imm)
+        store_stack(st, sim)
+        sim.ip = ip
+        sim.total_steps += steps